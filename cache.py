@@ -0,0 +1,35 @@
+import json
+import os
+import time
+
+
+class FileCache:
+    """JSON-file cache with a fixed time-to-live, one file per key."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        # A corrupt or foreign file is just a miss, never an error.
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["ts"] >= self.ttl:
+                return None
+            return entry["data"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        # .cache outlives the run (actions/cache), so never leave a
+        # half-written entry behind.
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ts": time.time(), "data": data}, f)
+        os.replace(tmp, path)
@@ -1,7 +1,14 @@
-import pandas as pd
+import csv
 import yfinance as yf
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+import math
 import os
+import threading
+import time
+
+from cache import FileCache
 
 TICKERS = [
     "AAPL",
@@ -11,30 +18,210 @@ TICKERS = [
     "PG"
 ]
 
-rows = []
+OUT_CSV = "data/screener_results.csv"
+
+FIELDS = [
+    "GeneratedUTC",
+    "Ticker",
+    "Name",
+    "Country",
+    "Sector",
+    "Industry",
+    "Price",
+    "DividendYield_%",
+    "PayoutRatio_%",
+    "PE",
+]
+
+# Slow-moving Ticker.info keys, cached for a day. Yield and PE are not
+# cached: they are derived from the per-share dividend and EPS against
+# the fresh price, so all price-dependent columns agree.
+INFO_FIELDS = [
+    "shortName",
+    "country",
+    "sector",
+    "industry",
+    "payoutRatio",
+    "dividendRate",
+    "trailingEps",
+]
+
+# Fetches are pure network I/O, so threads overlap the Yahoo round-trips.
+MAX_WORKERS = int(os.environ.get("SCREENER_WORKERS", 16))
+
+# Shared by all worker threads so a big ticker list stays within what
+# Yahoo tolerates; cache hits do not consume tokens.
+REQUESTS_PER_SECOND = 5
+
+# Company metadata barely moves between runs; prices are refreshed hourly.
+INFO_CACHE = FileCache(".cache/info", ttl=86400)
+PRICE_CACHE = FileCache(".cache/price", ttl=3600)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; take() blocks until a token is available."""
 
-for ticker in TICKERS:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Going negative reserves a future token; sleep off the debt
+            # outside the lock so other threads can queue behind us.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+
+YAHOO_BUCKET = TokenBucket(REQUESTS_PER_SECOND)
+
+
+def to_price(value):
+    # Yahoo reports missing quotes as None or NaN; both mean "no price".
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) else None
+
+
+def get_cached_info(ticker):
+    info = INFO_CACHE.get(ticker)
+    if info is None or any(key not in info for key in INFO_FIELDS):
+        return None
+    return info
+
+
+def fetch_prices(tickers):
+    # Last closes for tickers whose metadata is cached. yf.download still
+    # makes one chart request per symbol, so it goes through the bucket in
+    # batches of REQUESTS_PER_SECOND with one token per symbol.
+    for i in range(0, len(tickers), REQUESTS_PER_SECOND):
+        batch = tickers[i:i + REQUESTS_PER_SECOND]
+        for _ in batch:
+            YAHOO_BUCKET.take()
+
+        try:
+            data = yf.download(
+                batch,
+                period="5d",
+                group_by="ticker",
+                auto_adjust=False,
+                threads=True,
+                progress=False,
+                timeout=15,
+            )
+        except Exception as e:
+            print(f"Error on price download: {e}")
+            continue
+
+        for ticker in batch:
+            try:
+                close = data[ticker]["Close"].dropna()
+            except KeyError:
+                continue
+            price = to_price(close.iloc[-1]) if not close.empty else None
+            if price is not None:
+                PRICE_CACHE.set(ticker, price)
+
+
+def fetch_one(ticker, generated):
     try:
         stock = yf.Ticker(ticker)
-        info = stock.info
-
-        rows.append({
-            "GeneratedUTC": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-            "Ticker": ticker,
-            "Name": info.get("shortName"),
-            "Country": info.get("country"),
-            "Sector": info.get("sector"),
-            "Industry": info.get("industry"),
-            "Price": info.get("currentPrice"),
-            "DividendYield_%": (info.get("dividendYield") or 0) * 100,
-            "PayoutRatio_%": (info.get("payoutRatio") or 0) * 100,
-            "PE": info.get("trailingPE"),
-        })
+
+        live_price = None
+        info = get_cached_info(ticker)
+        if info is None:
+            YAHOO_BUCKET.take()
+            full = stock.info
+            info = {key: full.get(key) for key in INFO_FIELDS}
+            INFO_CACHE.set(ticker, info)
+            live_price = to_price(full.get("currentPrice"))
+
+        # A fresh info fetch already carries the live quote. Otherwise use
+        # the cached price (filled by fetch_prices) and fall back to
+        # fast_info for symbols it missed.
+        if live_price is not None:
+            price = live_price
+            PRICE_CACHE.set(ticker, price)
+        else:
+            price = PRICE_CACHE.get(ticker)
+            if price is None:
+                YAHOO_BUCKET.take()
+                price = to_price(stock.fast_info.last_price)
+                if price is not None:
+                    PRICE_CACHE.set(ticker, price)
+
+        get = info.get
+
+        rate = get("dividendRate") or 0
+        eps = get("trailingEps")
+        dividend_yield = rate / price * 100 if price else None
+        pe = price / eps if price and eps and eps > 0 else None
+
+        # Same order as FIELDS.
+        return (
+            generated,
+            ticker,
+            get("shortName"),
+            get("country"),
+            get("sector"),
+            get("industry"),
+            price,
+            dividend_yield,
+            (get("payoutRatio") or 0) * 100,
+            pe,
+        )
 
     except Exception as e:
         print(f"Error on {ticker}: {e}")
+        return None
+
+
+def main():
+    # Order-preserving dedupe, so a symbol listed twice is fetched once.
+    tickers = list(dict.fromkeys(TICKERS))
+
+    # Tickers missing from the info cache get their price from the
+    # Ticker.info call fetch_one has to make anyway.
+    stale = [
+        t for t in tickers
+        if get_cached_info(t) is not None and PRICE_CACHE.get(t) is None
+    ]
+    if stale:
+        fetch_prices(stale)
+
+    # One timestamp per run, shared by every row.
+    generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    os.makedirs(os.path.dirname(OUT_CSV), exist_ok=True)
+
+    # Rows go straight to disk as they arrive; ex.map keeps ticker order.
+    # Write to a temp file and rename it so a failed run never leaves a
+    # half-written CSV for the dashboard.
+    tmp = OUT_CSV + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            for row in ex.map(partial(fetch_one, generated=generated), tickers):
+                if row is not None:
+                    writer.writerow(row)
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, OUT_CSV)
 
-df = pd.DataFrame(rows)
 
-os.makedirs("data", exist_ok=True)
-df.to_csv("data/screener_results.csv", index=False)
+if __name__ == "__main__":
+    main()